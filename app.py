@@ -1,22 +1,135 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for
+from flask import Flask, Response, render_template, request, jsonify, redirect, url_for
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
 import joblib
+import orjson
+import numpy as np
 import os
 from forms import ProductPredictForm
-from utils import prepare_features_from_json, prepare_regression_features_from_json, signed_expm1
+from utils import (CLUSTER_FEATURES, MODEL_DIR, REGRESSION_FEATURES, format_money, prepare_features_from_json,
+                   prepare_regression_features_from_json, signed_expm1)
 from business_interpretation import KMEANS_BUSINESS, DBSCAN_BUSINESS
+from batching import MicroBatcher
+from compiled_trees import COMPILED_MODELS, load_predictor
+
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson for request parsing and jsonify()."""
+
+    option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=self.option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)
 app.secret_key = "dev-secret-key-please-change"
 app.config.setdefault('WTF_CSRF_ENABLED', False)
 
-# Models loaded from disk
-MODELS = {
-    "kmeans": joblib.load("models/kmeans_model.joblib"),
-    "dbscan": joblib.load("models/dbscan_model.joblib"),
-    "random_forest": joblib.load("models/random_forest_regressor.joblib"),
-    "xgboost": joblib.load("models/xgboost_regressor.joblib"),
+# Models loaded from disk. Arrays inside the joblib pickles are memory-mapped
+# read-only, so workers share them through the page cache instead of each
+# holding a private copy; point MODEL_DIR at a tmpfs copy (e.g. /dev/shm/models)
+# to keep the pages in RAM.
+MODEL_PATHS = {
+    "kmeans": "kmeans_model.joblib",
+    "dbscan": "dbscan_model.joblib",
+    "random_forest": "random_forest_regressor.joblib",
+    "xgboost": "xgboost_regressor.joblib",
+}
+MODELS = {name: joblib.load(os.path.join(MODEL_DIR, path), mmap_mode="r") for name, path in MODEL_PATHS.items()}
+
+# DBSCAN cannot label unseen points, so assign each request to the cluster of
+# its nearest core sample within eps (noise, -1, otherwise) instead of
+# refitting the model on a single row.
+DBSCAN_CORES = np.ascontiguousarray(MODELS["dbscan"].components_)
+DBSCAN_CORE_LABELS = np.asarray(MODELS["dbscan"].labels_)[MODELS["dbscan"].core_sample_indices_]
+DBSCAN_EPS_SQ = float(MODELS["dbscan"].eps) ** 2
+
+
+def dbscan_predict(X):
+    d2 = ((DBSCAN_CORES[None, :, :] - X[:, None, :]) ** 2).sum(axis=2)
+    nearest = d2.argmin(axis=1)
+    within = d2[np.arange(len(X)), nearest] <= DBSCAN_EPS_SQ
+    return np.where(within, DBSCAN_CORE_LABELS[nearest], -1)
+
+
+# Predict on XGBoost's native Booster: inplace_predict skips the DMatrix
+# construction XGBRegressor.predict does on every call.
+_XGB_BOOSTER = MODELS["xgboost"].get_booster()
+# Single-threaded per worker: avoids oversubscription when Gunicorn forks
+# several workers from the preloaded app (see gunicorn.conf.py).
+_XGB_BOOSTER.set_param({"nthread": 1})
+
+
+def xgboost_predict(X):
+    return _XGB_BOOSTER.inplace_predict(X.astype(np.float32, copy=False), predict_type="value")
+
+
+# Prefer native tree predictors built by compiled_trees.py; the loaded
+# models stay as the fallback when no (fresh) library is available.
+PREDICT_FNS = {
+    "kmeans": MODELS["kmeans"].predict,
+    "random_forest": MODELS["random_forest"].predict,
+    "xgboost": xgboost_predict,
+}
+for _name in COMPILED_MODELS:
+    _compiled = load_predictor(_name, os.path.join(MODEL_DIR, MODEL_PATHS[_name]), MODEL_DIR)
+    if _compiled is not None:
+        PREDICT_FNS[_name] = _compiled
+
+# One micro-batch queue per model so concurrent requests share a single
+# predict() call. The DBSCAN lookup is cheap enough to stay synchronous.
+BATCHERS = {name: MicroBatcher(fn) for name, fn in PREDICT_FNS.items()}
+
+# /ui dropdown choices
+_UI_GROUP_CHOICES = (("kmeans", "Predictor-1 (KMeans)"), ("dbscan", "Predictor-2 (DBSCAN)"))
+_UI_REV_CHOICES = (("xgboost", "Predictor-1 (XGBoost)"), ("random_forest", "Predictor-2 (Random Forest)"))
+
+# Business interpretation per cluster. KMeans labels are dense (0..k-1), so
+# they index a tuple; DBSCAN labels include -1 and stay a dict lookup.
+_UNKNOWN_GROUP = {"cluster_name": "unknown product cluster", "description": "", "recommended_action": ""}
+_KMEANS_TBL = tuple(KMEANS_BUSINESS.get(i, _UNKNOWN_GROUP) for i in range(max(KMEANS_BUSINESS) + 1))
+
+
+def _kmeans_business(cluster):
+    return _KMEANS_TBL[cluster] if 0 <= cluster < len(_KMEANS_TBL) else _UNKNOWN_GROUP
+
+
+def _dbscan_business(cluster):
+    return DBSCAN_BUSINESS.get(cluster, _UNKNOWN_GROUP)
+
+
+# Per-model specs, keyed by the ?model= value:
+#   group:   name -> (display name, predict(X), business lookup)
+#   revenue: name -> display name (prediction goes through BATCHERS[name])
+_GROUP_SPECS = {
+    "kmeans": ("KMeans", BATCHERS["kmeans"].predict, _kmeans_business),
+    "dbscan": ("DBSCAN", dbscan_predict, _dbscan_business),
+}
+_REV_NAMES = {"random_forest": "Random Forest", "xgboost": "XGBoost"}
+
+# Required JSON fields per endpoint
+_REQUIRED_GROUP = frozenset(CLUSTER_FEATURES)
+_REQUIRED_REV = frozenset(REGRESSION_FEATURES)
+_REQUIRED_ALL = _REQUIRED_GROUP | _REQUIRED_REV
+
+# Older /predict_all clients read these spellings of the canonical keys; they
+# are only added when the request sends `Accept: application/vnd.legacy+json`.
+LEGACY_MIMETYPE = "application/vnd.legacy+json"
+_LEGACY_ALIASES = {
+    "business": "description",
+    "Models": "models",
+    "Product Group": "product_group",
+    "Description": "description",
+    "Recommendation": "recommended_action",
+    "Next Month Revenue": "next_month_revenue",
+    "cluster_name": "product_group",
+    "next_month_revenue_formatted": "next_month_revenue",
 }
 
 
@@ -47,6 +160,12 @@ def api_info():
                     'ProductFrequency': 'int'
                 }
             },
+            "POST /predict/kmeans|dbscan|random_forest|xgboost": {
+                "expect_json": "same as /predict_group or /predict_revenue for that model"
+            },
+            "POST /predict_revenue/batch?model=random_forest|xgboost": {
+                "expect_ndjson": "one /predict_revenue JSON object per line"
+            },
             "POST /predict_all?group_model=kmeans|dbscan&rev_model=random_forest|xgboost": {
                 "expect_json": {
                     "NetRevenue": "float",
@@ -63,66 +182,115 @@ def api_info():
     })
 
 
-@app.route("/predict_group", methods=["POST"])
-def predict_group():
-    choice = request.args.get("model", "kmeans")
-    if choice not in MODELS:
-        return jsonify({"error": "Invalid model. Use model='kmeans' or model='dbscan'."}), 400
+def _make_group_handler(model_used, predict, business_for):
+    """Build the /predict_group view for one clustering model."""
+    def handler():
+        data = request.get_json() or {}
+        if not isinstance(data, dict):
+            return jsonify({"error": "Expected a JSON object."}), 400
+        missing = _REQUIRED_GROUP - data.keys()
+        if missing:
+            return jsonify({"error": f"Missing fields: {sorted(missing)}"}), 400
+        try:
+            cluster = int(predict(prepare_features_from_json(data))[0])
+        except Exception as e:
+            return jsonify({"error": f"Failed to prepare/predict: {str(e)}"}), 500
+        return jsonify({
+            "model_used": model_used,
+            "predicted_group": cluster,
+            "group_info": business_for(cluster),
+            "input_data": data
+        })
+    return handler
 
-    model = MODELS[choice]
-    data = request.get_json() or {}
-    required = {"NetQuantity", "NetRevenue", "NumTransactions", "NumUniqueCustomers"}
-    missing = [k for k in required if k not in data]
-    if missing:
-        return jsonify({"error": f"Missing fields: {missing}"}), 400
 
-    try:
-        X_scaled = prepare_features_from_json(data)
-        if choice == "kmeans":
-            cluster = int(model.predict(X_scaled)[0])
-            business = KMEANS_BUSINESS.get(cluster, {"cluster_name": "unknown product cluster", "description": ""})
-            model_used = "KMeans"
-        else:
-            cluster = int(model.fit_predict(X_scaled)[0])
-            business = DBSCAN_BUSINESS.get(cluster, {"cluster_name": "unknown product cluster", "description": ""})
-            model_used = "DBSCAN"
-    except Exception as e:
-        return jsonify({"error": f"Failed to prepare/predict: {str(e)}"}), 500
+def _make_revenue_handler(model_used, batcher):
+    """Build the /predict_revenue view for one regression model."""
+    def handler():
+        data = request.get_json() or {}
+        if not isinstance(data, dict):
+            return jsonify({"error": "Expected a JSON object."}), 400
+        missing = _REQUIRED_REV - data.keys()
+        if missing:
+            return jsonify({"error": f"Missing fields: {sorted(missing)}"}), 400
+        try:
+            pred_revenue = float(batcher.predict(prepare_regression_features_from_json(data))[0])
+            try:
+                pred_revenue = float(signed_expm1(pred_revenue))
+            except Exception:
+                pass
+            pred_formatted = format_money(pred_revenue)
+        except Exception as e:
+            return jsonify({"error": f"Failed to prepare/predict: {str(e)}"}), 500
+        return jsonify({
+            "model_used": model_used,
+            "input_data": data,
+            "next_month_revenue": pred_formatted,
+        })
+    return handler
 
-    return jsonify({
-        "model_used": model_used,
-        "predicted_group": int(cluster),
-        "group_info": business,
-        "input_data": data
-    })
+
+# Handlers are specialised per model at import; each is also served directly
+# at /predict/<model>.
+_GROUP_HANDLERS = {name: _make_group_handler(*spec) for name, spec in _GROUP_SPECS.items()}
+_REV_HANDLERS = {name: _make_revenue_handler(display, BATCHERS[name]) for name, display in _REV_NAMES.items()}
+for _name, _handler in {**_GROUP_HANDLERS, **_REV_HANDLERS}.items():
+    app.add_url_rule(f"/predict/{_name}", endpoint=f"predict_{_name}", view_func=_handler, methods=["POST"])
+
+
+@app.route("/predict_group", methods=["POST"])
+def predict_group():
+    handler = _GROUP_HANDLERS.get(request.args.get("model", "kmeans"))
+    if handler is None:
+        return jsonify({"error": "Invalid model. Use model='kmeans' or model='dbscan'."}), 400
+    return handler()
 
 
 @app.route("/predict_revenue", methods=["POST"])
 def predict_revenue():
+    handler = _REV_HANDLERS.get(request.args.get("model", "xgboost"))
+    if handler is None:
+        return jsonify({"error": "Invalid model. Use model='xgboost' or model='random_forest'."}), 400
+    return handler()
+
+
+@app.route("/predict_revenue/batch", methods=["POST"])
+def predict_revenue_batch():
+    """Score many products in one call: NDJSON in (one record per line), NDJSON out."""
     choice = request.args.get("model", "xgboost")
-    if choice not in ("random_forest", "xgboost"):
+    if choice not in _REV_NAMES:
         return jsonify({"error": "Invalid model. Use model='xgboost' or model='random_forest'."}), 400
-    model = MODELS[choice]
-    data = request.get_json() or {}
-    required = ['NetRevenue', 'NetRevenue_LastMonth', 'NetRevenue_MA3', 'Month', 'ProductFrequency']
-    missing = [k for k in required if k not in data]
-    if missing:
-        return jsonify({"error": f"Missing fields: {missing}"}), 400
-    try:
-        X_scaled = prepare_regression_features_from_json(data)
-        pred_revenue = float(model.predict(X_scaled)[0])
+
+    rows = []
+    for lineno, line in enumerate(request.stream, start=1):
+        if not line.strip():
+            continue
         try:
-            pred_revenue = float(signed_expm1(pred_revenue))
-        except Exception:
-            pass
-        pred_formatted = f"${pred_revenue:,.2f}"
+            record = orjson.loads(line)
+        except orjson.JSONDecodeError:
+            record = None
+        if not isinstance(record, dict):
+            return jsonify({"error": f"Line {lineno}: expected a JSON object"}), 400
+        missing = _REQUIRED_REV - record.keys()
+        if missing:
+            return jsonify({"error": f"Line {lineno}: missing fields: {sorted(missing)}"}), 400
+        rows.append(record)
+    if not rows:
+        return jsonify({"error": "No records in request body."}), 400
+
+    try:
+        X = np.empty((len(rows), len(REGRESSION_FEATURES)))
+        for i, record in enumerate(rows):
+            X[i] = prepare_regression_features_from_json(record)[0]
+        preds = signed_expm1(np.asarray(PREDICT_FNS[choice](X), dtype=float))
     except Exception as e:
         return jsonify({"error": f"Failed to prepare/predict: {str(e)}"}), 500
-    return jsonify({
-        "model_used": "XGBoost" if choice == "xgboost" else "Random Forest",
-        "input_data": data,
-        "next_month_revenue": pred_formatted,
-    })
+
+    def generate():
+        for pred in preds:
+            yield orjson.dumps({"next_month_revenue": format_money(pred)}) + b"\n"
+
+    return Response(generate(), mimetype="application/x-ndjson")
 
 
 @app.route("/predict_all", methods=["POST"])
@@ -130,64 +298,51 @@ def predict_all():
     group_choice = request.args.get("group_model", "kmeans")
     rev_choice = request.args.get("rev_model", "xgboost")
 
-    if group_choice not in ("kmeans", "dbscan"):
+    if group_choice not in _GROUP_SPECS:
         return jsonify({"error": "Invalid group_model. Use group_model='kmeans' or 'dbscan'."}), 400
-    if rev_choice not in ("random_forest", "xgboost"):
+    if rev_choice not in _REV_NAMES:
         return jsonify({"error": "Invalid rev_model. Use rev_model='xgboost' or 'random_forest'."}), 400
 
     data = request.get_json() or {}
-    required = {"NetRevenue", "NetQuantity", "NumTransactions", "NumUniqueCustomers",
-                "NetRevenue_LastMonth", "NetRevenue_MA3", "Month", "ProductFrequency"}
-    missing = [k for k in required if k not in data]
+    if not isinstance(data, dict):
+        return jsonify({"error": "Expected a JSON object."}), 400
+    missing = _REQUIRED_ALL - data.keys()
     if missing:
-        return jsonify({"error": f"Missing fields: {missing}"}), 400
+        return jsonify({"error": f"Missing fields: {sorted(missing)}"}), 400
 
     try:
         Xc = prepare_features_from_json(data)
-        if group_choice == "kmeans":
-            Group = int(MODELS["kmeans"].predict(Xc)[0])
-            Group_info = KMEANS_BUSINESS.get(Group, {"cluster_name": "unknown product cluster", "description": "", "recommended_action": ""})
-            group_model = "KMeans"
-        else:
-            Group = int(MODELS["dbscan"].fit_predict(Xc)[0])
-            Group_info = DBSCAN_BUSINESS.get(Group, {"cluster_name": "unknown product cluster", "description": "", "recommended_action": ""})
-            group_model = "DBSCAN"
-
         Xr = prepare_regression_features_from_json(data)
-        rev_model = MODELS[rev_choice]
-        pred = float(rev_model.predict(Xr)[0])
+        # Queue the revenue prediction first so it runs on its batcher thread
+        # while the group is predicted.
+        rev_future = BATCHERS[rev_choice].submit(Xr)
+        group_model, group_predict, business_for = _GROUP_SPECS[group_choice]
+        Group_info = business_for(int(group_predict(Xc)[0]))
+
+        pred = float(rev_future.result()[0])
         try:
             pred = float(signed_expm1(pred))
         except Exception:
             pass
-        pred_formatted = f"${pred:,.2f}"
-        model_name = "XGBoost" if rev_choice == "xgboost" else "Random Forest"
+        pred_formatted = format_money(pred)
+        model_name = _REV_NAMES[rev_choice]
     except Exception as e:
         return jsonify({"error": f"Failed to prepare/predict: {str(e)}"}), 500
 
     resp = {
-       
         "product_group": Group_info.get("cluster_name"),
-        "business": Group_info.get("description"),
+        "description": Group_info.get("description"),
         "recommended_action": Group_info.get("recommended_action"),
         "next_month_revenue": pred_formatted,
-      
-        "Models": [group_model, model_name],
-        "Product Group": Group_info.get("cluster_name"),
-        "Description": Group_info.get("description"),
-        "Recommendation": Group_info.get("recommended_action"),
-        "Next Month Revenue": pred_formatted,
-
-        "cluster_name": Group_info.get("cluster_name"),
-        "description": Group_info.get("description"),
-        "next_month_revenue_formatted": pred_formatted
+        "models": [group_model, model_name],
     }
+    if LEGACY_MIMETYPE in request.accept_mimetypes.values():
+        resp.update({alias: resp[key] for alias, key in _LEGACY_ALIASES.items()})
 
     if request.args.get('debug') in ('1', 'true', 'True'):
         try:
-            features = ['NetRevenue', 'NetRevenue_LastMonth', 'NetRevenue_MA3', 'Month', 'ProductFrequency']
-            raw_vals = {f: data.get(f) for f in features}
-            scaled = prepare_regression_features_from_json(data).tolist()
+            raw_vals = {f: data.get(f) for f in REGRESSION_FEATURES}
+            scaled = Xr.tolist()
             resp['debug'] = {'raw_regression_input': raw_vals, 'scaled_regression_input': scaled, 'raw_prediction': pred}
         except Exception as e:
             resp['debug_error'] = str(e)
@@ -198,9 +353,7 @@ def predict_all():
 @app.route("/ui", methods=["GET", "POST"])
 def ui_predict():
     form = ProductPredictForm()
-    group_models = [("kmeans", "Predictor-1 (KMeans)"), ("dbscan", "Predictor-2 (DBSCAN)")]
-    rev_models = [("xgboost", "Predictor-1 (XGBoost)"), ("random_forest", "Predictor-2 (Random Forest)")]
-    return render_template("forms.html", form=form, group_models=group_models, rev_models=rev_models)
+    return render_template("forms.html", form=form, group_models=_UI_GROUP_CHOICES, rev_models=_UI_REV_CHOICES)
 
 
 if __name__ == "__main__":
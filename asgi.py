@@ -0,0 +1,31 @@
+"""ASGI entry point for the prediction API.
+
+Serve with uvicorn instead of the Flask dev server, e.g.:
+
+    uvicorn asgi:asgi_app --host 0.0.0.0 --port 7000 --workers 4
+
+a2wsgi's WSGIMiddleware runs each Flask view on a thread pool of
+ASGI_THREADS threads (default 10), so concurrent requests are handled in
+parallel and model inference never blocks the event loop.
+"""
+import os
+
+from a2wsgi import WSGIMiddleware
+
+from app import app
+
+ASGI_THREADS = int(os.environ.get("ASGI_THREADS", 10))
+
+
+def to_asgi(wsgi_app, workers: int = ASGI_THREADS):
+    def terminated_input(environ, start_response):
+        # The adapter feeds wsgi.input until the final body chunk, so tell
+        # Werkzeug to read it to EOF; otherwise chunked bodies (no
+        # Content-Length) reach Flask as an empty stream.
+        environ["wsgi.input_terminated"] = True
+        return wsgi_app(environ, start_response)
+
+    return WSGIMiddleware(terminated_input, workers=workers)
+
+
+asgi_app = to_asgi(app)
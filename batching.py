@@ -0,0 +1,101 @@
+import os
+import queue
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+
+import numpy as np
+
+MAX_BATCH = 64
+# Extra time to wait for more rows after the first one. 0 only batches rows
+# that queued up while the previous batch was predicting, so a lone request
+# never waits; raise it (BATCH_MAX_WAIT_MS) to trade latency for larger batches.
+MAX_WAIT_MS = float(os.environ.get("BATCH_MAX_WAIT_MS", 0))
+
+
+class MicroBatcher:
+    """Coalesce concurrent single-row predictions into one batched call.
+
+    Request threads push their feature row onto a queue and wait on a
+    Future; a background worker drains up to `max_batch` rows (waiting at most
+    `max_wait_ms` after the first one), runs `predict_fn` once on the
+    stacked rows and hands each caller back its own slice. If the batched
+    call fails, rows are retried one by one so only the bad row errors.
+
+    Threads do not survive fork(), so the first submit() in a forked child
+    (e.g. a Gunicorn worker with --preload) starts a fresh queue and worker
+    thread. The worker only holds a weak reference to the batcher and exits
+    once the batcher is garbage-collected.
+    """
+
+    def __init__(self, predict_fn, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+        self.predict_fn = predict_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._start()
+
+    def _start(self):
+        q = queue.Queue()
+        self._queue = q
+        threading.Thread(target=MicroBatcher._run, args=(weakref.ref(self), q), daemon=True).start()
+        # wake the worker so it can exit when the batcher goes away
+        weakref.finalize(self, q.put, None)
+        # set last: a thread that sees this pid also sees the live queue
+        self._pid = os.getpid()
+
+    def submit(self, X: np.ndarray) -> Future:
+        """Queue a (1, n_features) row; the Future resolves to a length-1 array."""
+        if self._pid != os.getpid():
+            self._start()
+        future = Future()
+        self._queue.put((X, future))
+        return future
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Predict a (1, n_features) row; returns a length-1 array like `model.predict`."""
+        return self.submit(X).result()
+
+    def _collect(self, q, first):
+        items = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(items) < self.max_batch:
+            try:
+                items.append(q.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                items.append(q.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return items
+
+    def _predict_each(self, items):
+        for row, future in items:
+            try:
+                future.set_result(self.predict_fn(row))
+            except Exception as e:
+                future.set_exception(e)
+
+    @staticmethod
+    def _run(ref, q):
+        while True:
+            first = q.get()
+            batcher = ref()
+            if batcher is None:
+                return
+            batcher._process(batcher._collect(q, first))
+            del batcher
+
+    def _process(self, items):
+        try:
+            preds = self.predict_fn(np.vstack([row for row, _ in items]))
+        except Exception:
+            self._predict_each(items)
+            return
+        for i, (_, future) in enumerate(items):
+            future.set_result(preds[i:i + 1])
@@ -0,0 +1,72 @@
+"""Tree ensembles compiled to native code with Treelite + TL2cgen.
+
+Build the shared libraries once after (re)training the regressors:
+
+    python compiled_trees.py
+
+At startup the app swaps the compiled predictors in for sklearn/XGBoost
+`predict()` when a library is present and newer than its model file;
+otherwise the original model is used.
+"""
+import os
+
+import numpy as np
+
+try:
+    import treelite
+    import tl2cgen
+except ImportError:
+    treelite = None
+    tl2cgen = None
+
+COMPILED_MODELS = ("random_forest", "xgboost")
+
+
+def lib_path(name: str, model_dir: str) -> str:
+    return os.path.join(model_dir, "compiled", f"{name}.so")
+
+
+def _to_treelite(name, model):
+    if name == "xgboost":
+        return treelite.frontend.from_xgboost(model.get_booster())
+    return treelite.sklearn.import_model(model)
+
+
+def export_model(name: str, model, model_dir: str) -> str:
+    """Compile `model` into a shared library under `<model_dir>/compiled/`."""
+    path = lib_path(name, model_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tl2cgen.export_lib(
+        _to_treelite(name, model),
+        toolchain="gcc",
+        libpath=path,
+        params={"parallel_comp": os.cpu_count() or 1},
+    )
+    return path
+
+
+def load_predictor(name: str, model_path: str, model_dir: str):
+    """Return a `predict(X) -> (n,)` function backed by the compiled library, or None."""
+    if tl2cgen is None:
+        return None
+    path = lib_path(name, model_dir)
+    if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(model_path):
+        return None
+    # nthread=1: no native thread pool, which would not survive a pre-fork load
+    predictor = tl2cgen.Predictor(path, nthread=1)
+
+    def predict(X):
+        # sklearn and XGBoost compare float32 inputs against the thresholds, so
+        # cast the same way to get identical splits. TL2cgen returns
+        # (n_rows, n_targets, n_classes); regressors have one of each.
+        X = np.asarray(X, dtype=np.float32)
+        return predictor.predict(tl2cgen.DMatrix(X)).reshape(len(X))
+
+    return predict
+
+
+if __name__ == "__main__":
+    from app import MODELS, MODEL_DIR
+
+    for name in COMPILED_MODELS:
+        print(f"Compiling {name} -> {export_model(name, MODELS[name], MODEL_DIR)}")
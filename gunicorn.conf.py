@@ -0,0 +1,13 @@
+# Gunicorn settings, picked up automatically when run from the repo root:
+#
+#     gunicorn app:app
+#
+# preload_app loads app.py (and every model) once in the master process;
+# workers are forked afterwards and share those pages copy-on-write.
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 7000)}"
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+preload_app = True
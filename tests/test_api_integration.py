@@ -1,11 +1,12 @@
 import sys
 import os
 import json
+import numpy as np
 
 # ensure project root is importable for pytest
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from app import app
+from app import app, dbscan_predict, DBSCAN_CORES, DBSCAN_CORE_LABELS
 
 
 def test_predict_all_endpoint():
@@ -28,3 +29,73 @@ def test_predict_all_endpoint():
     assert 'next_month_revenue' in data
     assert 'models' in data
     assert 'debug' in data
+
+
+def test_predict_all_legacy_aliases():
+    client = app.test_client()
+    payload = {
+        "NetRevenue": 120.0,
+        "NetQuantity": 10,
+        "NumTransactions": 4,
+        "NumUniqueCustomers": 3,
+        "NetRevenue_LastMonth": 100.0,
+        "NetRevenue_MA3": 110.0,
+        "Month": 3,
+        "ProductFrequency": 2
+    }
+    data = client.post('/predict_all', json=payload).get_json()
+    assert 'Product Group' not in data
+    legacy = client.post('/predict_all', json=payload,
+                         headers={'Accept': 'application/vnd.legacy+json'}).get_json()
+    assert legacy['Product Group'] == legacy['product_group'] == data['product_group']
+    assert legacy['Next Month Revenue'] == legacy['next_month_revenue']
+
+
+def test_predict_revenue_batch_matches_single():
+    client = app.test_client()
+    records = [
+        {"NetRevenue": 100.0, "NetRevenue_LastMonth": 90.0, "NetRevenue_MA3": 95.0, "Month": 5, "ProductFrequency": 2},
+        {"NetRevenue": -12.5, "NetRevenue_LastMonth": -10.0, "NetRevenue_MA3": -11.0, "Month": 6, "ProductFrequency": 3},
+    ]
+    body = "\n".join(json.dumps(r) for r in records) + "\n"
+    resp = client.post('/predict_revenue/batch?model=random_forest', data=body,
+                       content_type='application/x-ndjson')
+    assert resp.status_code == 200
+    lines = [json.loads(line) for line in resp.data.decode().splitlines()]
+    assert len(lines) == len(records)
+    for record, line in zip(records, lines):
+        single = client.post('/predict_revenue?model=random_forest', json=record).get_json()
+        assert line['next_month_revenue'] == single['next_month_revenue']
+
+    bad = client.post('/predict_revenue/batch', data='{"Month": 1}\n', content_type='application/x-ndjson')
+    assert bad.status_code == 400
+
+
+def test_model_specific_routes_match_generic():
+    client = app.test_client()
+    group_payload = {"NetRevenue": 120.0, "NetQuantity": 10, "NumTransactions": 4, "NumUniqueCustomers": 3}
+    rev_payload = {"NetRevenue": 100.0, "NetRevenue_LastMonth": 90.0, "NetRevenue_MA3": 95.0,
+                   "Month": 5, "ProductFrequency": 2}
+    for model in ('kmeans', 'dbscan'):
+        assert (client.post(f'/predict/{model}', json=group_payload).get_json()
+                == client.post(f'/predict_group?model={model}', json=group_payload).get_json())
+    for model in ('random_forest', 'xgboost'):
+        assert (client.post(f'/predict/{model}', json=rev_payload).get_json()
+                == client.post(f'/predict_revenue?model={model}', json=rev_payload).get_json())
+    assert client.post('/predict_group?model=xgboost', json=group_payload).status_code == 400
+
+
+def test_non_object_json_body_is_rejected():
+    client = app.test_client()
+    for path in ('/predict_group', '/predict_revenue', '/predict_all', '/predict/kmeans'):
+        for body in ([1, 2], "x", 3):
+            resp = client.post(path, json=body)
+            assert resp.status_code == 400
+            assert 'error' in resp.get_json()
+
+
+def test_dbscan_predict_uses_core_samples():
+    # core samples belong to their own cluster; far-away points are noise
+    assert np.array_equal(dbscan_predict(DBSCAN_CORES[:20]), DBSCAN_CORE_LABELS[:20])
+    far = np.full((1, DBSCAN_CORES.shape[1]), 1e6)
+    assert dbscan_predict(far)[0] == -1
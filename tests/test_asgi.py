@@ -0,0 +1,95 @@
+import sys
+import os
+import asyncio
+import json
+import time
+
+from flask import Flask
+
+# ensure project root is importable for pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from asgi import asgi_app, to_asgi
+
+
+def _request(asgi_app, path, method='GET', chunks=(b'',), headers=()):
+    path, _, query = path.partition('?')
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': method,
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': query.encode(),
+        'root_path': '', 'headers': list(headers), 'server': ('testserver', 80), 'client': ('127.0.0.1', 1234),
+    }
+    messages = []
+    pending = list(chunks)
+
+    async def receive():
+        body = pending.pop(0) if pending else b''
+        return {'type': 'http.request', 'body': body, 'more_body': bool(pending)}
+
+    async def send(message):
+        messages.append(message)
+
+    async def run():
+        await asgi_app(scope, receive, send)
+        return messages
+
+    return run()
+
+
+def _get(asgi_app, path):
+    return _request(asgi_app, path)
+
+
+def _post_chunked(asgi_app, path, chunks, content_type):
+    """POST `chunks` as separate body messages with no Content-Length, like a chunked upload."""
+    headers = [(b'content-type', content_type), (b'transfer-encoding', b'chunked')]
+    messages = asyncio.run(_request(asgi_app, path, 'POST', chunks, headers))
+    body = b''.join(m.get('body', b'') for m in messages if m['type'] == 'http.response.body')
+    return messages[0]['status'], body
+
+
+def test_slow_requests_run_concurrently():
+    slow = Flask(__name__)
+
+    @slow.route('/slow')
+    def slow_view():
+        time.sleep(0.3)
+        return 'ok'
+
+    slow_app = to_asgi(slow, workers=4)
+
+    async def main():
+        start = time.monotonic()
+        results = await asyncio.gather(*[_get(slow_app, '/slow') for _ in range(4)])
+        return time.monotonic() - start, results
+
+    elapsed, results = asyncio.run(main())
+    assert all(msgs[0]['status'] == 200 for msgs in results)
+    # serialised execution would take >= 1.2 s
+    assert elapsed < 0.9
+
+
+def test_chunked_json_body_reaches_app():
+    payload = json.dumps({"NetRevenue": 100.0, "NetRevenue_LastMonth": 90.0, "NetRevenue_MA3": 95.0,
+                          "Month": 5, "ProductFrequency": 2}).encode()
+    status, body = _post_chunked(asgi_app, '/predict_revenue?model=xgboost',
+                                 [payload[:20], payload[20:]], b'application/json')
+    assert status == 200
+    assert 'next_month_revenue' in json.loads(body)
+
+
+def test_chunked_ndjson_batch_reaches_app():
+    records = [
+        {"NetRevenue": 100.0, "NetRevenue_LastMonth": 90.0, "NetRevenue_MA3": 95.0, "Month": 5, "ProductFrequency": 2},
+        {"NetRevenue": -12.5, "NetRevenue_LastMonth": -10.0, "NetRevenue_MA3": -11.0, "Month": 6, "ProductFrequency": 3},
+        {"NetRevenue": 5000.0, "NetRevenue_LastMonth": 4000.0, "NetRevenue_MA3": 4500.0, "Month": 11, "ProductFrequency": 8},
+    ]
+    body = b''.join(json.dumps(r).encode() + b'\n' for r in records)
+    # split mid-record so lines span body messages
+    chunks = [body[i:i + 37] for i in range(0, len(body), 37)]
+    status, resp = _post_chunked(asgi_app, '/predict_revenue/batch?model=xgboost', chunks,
+                                 b'application/x-ndjson')
+    assert status == 200
+    lines = [json.loads(line) for line in resp.decode().splitlines()]
+    assert len(lines) == len(records)
+    assert all('next_month_revenue' in line for line in lines)
@@ -0,0 +1,105 @@
+import sys
+import os
+import gc
+import threading
+import time
+import weakref
+import numpy as np
+import pytest
+
+# ensure project root is importable for pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from batching import MicroBatcher
+
+
+def test_concurrent_rows_are_coalesced_and_scattered():
+    batch_sizes = []
+
+    def predict(X):
+        batch_sizes.append(len(X))
+        return X.sum(axis=1)
+
+    batcher = MicroBatcher(predict, max_wait_ms=50)
+    results = {}
+
+    def call(i):
+        results[i] = batcher.predict(np.array([[i, i]], dtype=float))
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sum(batch_sizes) == 8
+    assert len(batch_sizes) < 8
+    for i in range(8):
+        assert results[i].shape == (1,)
+        assert results[i][0] == 2 * i
+
+
+def test_predict_error_is_raised_in_caller():
+    def predict(X):
+        raise ValueError("boom")
+
+    batcher = MicroBatcher(predict, max_wait_ms=1)
+    with pytest.raises(ValueError):
+        batcher.predict(np.zeros((1, 4)))
+
+
+def test_bad_row_does_not_fail_its_batch():
+    def predict(X):
+        if np.isnan(X).any():
+            raise ValueError("Input contains NaN")
+        return X.sum(axis=1)
+
+    batcher = MicroBatcher(predict, max_wait_ms=50)
+    results = {}
+
+    def call(i):
+        row = np.array([[np.nan if i == 0 else float(i), 1.0]])
+        try:
+            results[i] = batcher.predict(row)[0]
+        except ValueError as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert isinstance(results[0], ValueError)
+    for i in range(1, 6):
+        assert results[i] == i + 1.0
+
+
+def test_lone_row_is_not_held_for_the_window():
+    batcher = MicroBatcher(lambda X: X.sum(axis=1), max_wait_ms=0)
+    batcher.predict(np.zeros((1, 2)))
+    start = time.monotonic()
+    for _ in range(20):
+        batcher.predict(np.zeros((1, 2)))
+    # 20 serial calls would take >= 100 ms with the old fixed 5 ms window
+    assert time.monotonic() - start < 0.1
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires fork()")
+def test_batcher_works_in_forked_child():
+    batcher = MicroBatcher(lambda X: X.sum(axis=1), max_wait_ms=1)
+    pid = os.fork()
+    if pid == 0:
+        ok = batcher.predict(np.array([[1.0, 2.0]]))[0] == 3.0
+        os._exit(0 if ok else 1)
+    _, status = os.waitpid(pid, 0)
+    assert os.WEXITSTATUS(status) == 0
+
+
+def test_batcher_can_be_garbage_collected():
+    batcher = MicroBatcher(lambda X: X.sum(axis=1), max_wait_ms=0)
+    batcher.predict(np.zeros((1, 2)))
+    ref = weakref.ref(batcher)
+    del batcher
+    gc.collect()
+    assert ref() is None
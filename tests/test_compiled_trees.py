@@ -0,0 +1,77 @@
+import sys
+import os
+import warnings
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+# ensure project root is importable for pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from compiled_trees import export_model, lib_path, load_predictor
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+FEATURES = ['NetRevenue', 'NetRevenue_LastMonth', 'NetRevenue_MA3', 'Month', 'ProductFrequency']
+
+
+@pytest.fixture(scope="module")
+def dataset():
+    df = pd.read_csv(os.path.join(ROOT, 'dataset/processed/product_revenue_dataset.csv'),
+                     skipinitialspace=True, nrows=5000)
+    return df[FEATURES].to_numpy(dtype=np.float64), df['NextMonthRevenue'].to_numpy()
+
+
+def _compiled(name, model, tmp_path):
+    model_path = tmp_path / "model.joblib"
+    model_path.write_bytes(b"")
+    os.utime(model_path, (0, 0))
+    export_model(name, model, str(tmp_path))
+    return load_predictor(name, str(model_path), str(tmp_path))
+
+
+def test_missing_library_falls_back(tmp_path):
+    model_path = tmp_path / "model.joblib"
+    model_path.write_bytes(b"")
+    assert load_predictor("xgboost", str(model_path), str(tmp_path)) is None
+
+
+def test_stale_library_is_ignored(tmp_path):
+    model_path = tmp_path / "model.joblib"
+    model_path.write_bytes(b"")
+    lib = lib_path("xgboost", str(tmp_path))
+    os.makedirs(os.path.dirname(lib))
+    with open(lib, "wb"):
+        pass
+    os.utime(lib, (0, 0))
+    assert load_predictor("xgboost", str(model_path), str(tmp_path)) is None
+
+
+def test_compiled_random_forest_matches_sklearn(dataset, tmp_path):
+    X, y = dataset
+    model = RandomForestRegressor(n_estimators=10, max_depth=10, random_state=0).fit(X, y)
+    predict = _compiled("random_forest", model, tmp_path)
+    assert np.allclose(predict(X), model.predict(X), rtol=0, atol=1e-9)
+
+
+def test_compiled_xgboost_matches_xgboost(dataset, tmp_path):
+    X, _ = dataset
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        model = joblib.load(os.path.join(ROOT, 'models/xgboost_regressor.joblib'))
+    predict = _compiled("xgboost", model, tmp_path)
+    # only float32 summation order differs
+    assert np.allclose(predict(X), model.predict(X), rtol=0, atol=1e-5)
+
+
+def test_built_random_forest_library_matches_model(dataset):
+    model_path = os.path.join(ROOT, 'models/random_forest_regressor.joblib')
+    predict = load_predictor("random_forest", model_path, os.path.join(ROOT, 'models'))
+    if predict is None:
+        pytest.skip("compiled Random Forest not built (python compiled_trees.py)")
+    X, _ = dataset
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        model = joblib.load(model_path)
+    assert np.allclose(predict(X), model.predict(X), rtol=0, atol=1e-9)
@@ -6,7 +6,7 @@ import pytest
 # ensure project root is importable for pytest
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from utils import prepare_regression_features_from_json, reg_scaler
+from utils import format_money, prepare_regression_features_from_json, reg_scaler
 
 
 def test_prepare_regression_features_shape():
@@ -36,7 +36,15 @@ def test_prepare_regression_values_consistent():
         "Month": 6,
         "ProductFrequency": 3
     }
-    arr1 = prepare_regression_features_from_json(sample)
+    # the result is a reused per-thread buffer, so keep a copy of the first call
+    arr1 = prepare_regression_features_from_json(sample).copy()
     # calling twice should produce same scaled array
     arr2 = prepare_regression_features_from_json(sample)
     assert np.allclose(arr1, arr2)
+
+
+def test_format_money_matches_format_spec():
+    values = [0.0, -0.004, 9.385, -9.39, 999.99, 999.994, 999.995, -999.996,
+              1000.0, 12987.45, -1234567.891, float('nan')]
+    for v in values:
+        assert format_money(v) == f"${v:,.2f}"
@@ -1,17 +1,52 @@
+import math
+import os
+import threading
+
 import numpy as np
 import joblib
-import pandas as pd
+from numba import njit, vectorize
 
 CLUSTER_FEATURES = ["NetQuantity", "NetRevenue", "NumTransactions", "NumUniqueCustomers"]
+REGRESSION_FEATURES = ['NetRevenue', 'NetRevenue_LastMonth', 'NetRevenue_MA3', 'Month', 'ProductFrequency']
+LOG_FEATURES = ('NetRevenue', 'NetRevenue_LastMonth', 'NetRevenue_MA3')
+
+# Directory holding the scalers and models (app.py loads its models from here too)
+MODEL_DIR = os.environ.get("MODEL_DIR", "models")
 
 # Load scalers
-SCALER = joblib.load("models/clustering_scaler.pkl")
-reg_scaler = joblib.load("models/regression_scaler.pkl")
+SCALER = joblib.load(os.path.join(MODEL_DIR, "clustering_scaler.pkl"))
+reg_scaler = joblib.load(os.path.join(MODEL_DIR, "regression_scaler.pkl"))
 try:
-    reg_scaler_tgt = joblib.load("models/regression_scaler_tgtlog1p.pkl")
+    reg_scaler_tgt = joblib.load(os.path.join(MODEL_DIR, "regression_scaler_tgtlog1p.pkl"))
 except Exception:
     reg_scaler_tgt = None
 
+# Scaler parameters as plain arrays so the jitted kernels never touch sklearn.
+# Columns follow the order each scaler was fitted with; the regression scaler
+# names revenue columns with a `_log1p` suffix.
+_CLUSTER_ORDER = [str(f) for f in getattr(SCALER, "feature_names_in_", CLUSTER_FEATURES)]
+_CLUSTER_MEAN = np.ascontiguousarray(SCALER.mean_, dtype=np.float64)
+_CLUSTER_SCALE = np.ascontiguousarray(SCALER.scale_, dtype=np.float64)
+
+_REG_ORDER = [
+    str(f).replace("_log1p", "")
+    for f in getattr(reg_scaler, "feature_names_in_", REGRESSION_FEATURES)
+]
+_REG_LOG_MASK = np.array([f in LOG_FEATURES for f in _REG_ORDER], dtype=np.bool_)
+_REG_MEAN = np.ascontiguousarray(reg_scaler.mean_, dtype=np.float64)
+_REG_SCALE = np.ascontiguousarray(reg_scaler.scale_, dtype=np.float64)
+
+# Per-thread (raw, scaled) buffers reused across requests
+_TLS = threading.local()
+
+
+def _buffers(name: str, n: int):
+    bufs = getattr(_TLS, name, None)
+    if bufs is None:
+        bufs = (np.empty(n), np.empty((1, n)))
+        setattr(_TLS, name, bufs)
+    return bufs
+
 
 def signed_log1p(x):
     """Sign-preserving log1p: sign(x) * log1p(|x|)."""
@@ -19,42 +54,76 @@ def signed_log1p(x):
     return np.sign(a) * np.log1p(np.abs(a))
 
 
+@vectorize(['float64(float64)'], fastmath=True, cache=True)
 def signed_expm1(x):
     """Inverse of signed_log1p: sign(y) * expm1(|y|)."""
-    a = np.asarray(x, dtype=float)
-    return np.sign(a) * (np.expm1(np.abs(a)))
+    return math.copysign(math.expm1(abs(x)), x)
+
+
+def format_money(x: float) -> str:
+    """Format revenue like f"${x:,.2f}" (e.g. "$-1,234.50").
+
+    Values that round below 1,000 in magnitude need no thousands separator,
+    so they take the cheaper printf-style path.
+    """
+    if -999.995 < x < 999.995:
+        return "$%.2f" % x
+    return f"${x:,.2f}"
+
+
+@njit('void(f8[::1], f8[::1], f8[::1], f8[::1])', cache=True, fastmath=True)
+def _scale_group(raw, out, means, stds):
+    """Standard-scale `raw` into `out`."""
+    for i in range(raw.shape[0]):
+        out[i] = (raw[i] - means[i]) / stds[i]
+
+
+@njit('void(f8[::1], f8[::1], f8[::1], f8[::1], b1[::1])', cache=True, fastmath=True)
+def _scale_regression(raw, out, means, stds, log_mask):
+    """Apply signed log1p to the masked columns of `raw`, then standard-scale into `out`."""
+    for i in range(raw.shape[0]):
+        v = raw[i]
+        if log_mask[i]:
+            if v < 0.0:
+                v = -np.log1p(-v)
+            else:
+                v = np.log1p(v)
+        out[i] = (v - means[i]) / stds[i]
 
 
 def prepare_features_from_json(record: dict) -> np.ndarray:
-    """Return scaled clustering features as a 2D numpy array."""
-    values = {f: float(record.get(f, 0.0)) for f in CLUSTER_FEATURES}
-    df = pd.DataFrame([values], columns=CLUSTER_FEATURES)
-    return SCALER.transform(df)
+    """Return scaled clustering features as a 2D numpy array.
+
+    The array is a per-thread buffer overwritten by the next call on the
+    same thread; copy it if it must outlive the request.
+    """
+    raw, out = _buffers("cluster", len(_CLUSTER_ORDER))
+    for i, f in enumerate(_CLUSTER_ORDER):
+        raw[i] = float(record.get(f, 0.0))
+    _scale_group(raw, out[0], _CLUSTER_MEAN, _CLUSTER_SCALE)
+    return out
 
 
 def prepare_regression_features_from_json(record: dict) -> np.ndarray:
     """Prepare regression features (apply signed log to revenues and scale).
 
-    The scaler expects revenue columns suffixed with `_log1p`, so we rename
-    them after applying the signed transform.
+    Columns are laid out in the regression scaler's fitted order, where the
+    revenue features carry a `_log1p` suffix. Like the clustering helper,
+    the result lives in a per-thread buffer reused by the next call.
+    """
+    raw, out = _buffers("regression", len(_REG_ORDER))
+    for i, f in enumerate(_REG_ORDER):
+        raw[i] = float(record.get(f, 0.0))
+    _scale_regression(raw, out[0], _REG_MEAN, _REG_SCALE, _REG_LOG_MASK)
+    return out
+
+
+def _warmup():
+    """Run every jitted path once so Numba's on-disk cache is populated.
+
+    Call at image build time (`python -c "import utils; utils._warmup()"`)
+    so workers load machine code from the cache instead of compiling it.
     """
-    features = ['NetRevenue', 'NetRevenue_LastMonth', 'NetRevenue_MA3', 'Month', 'ProductFrequency']
-    values = {f: float(record.get(f, 0.0)) for f in features}
-    df = pd.DataFrame([values], columns=features)
-
-    for c in ['NetRevenue', 'NetRevenue_LastMonth', 'NetRevenue_MA3']:
-        df[c] = signed_log1p(df[c].values)
-
-    df = df.rename(columns={
-        'NetRevenue': 'NetRevenue_log1p',
-        'NetRevenue_LastMonth': 'NetRevenue_LastMonth_log1p',
-        'NetRevenue_MA3': 'NetRevenue_MA3_log1p'
-    })
-
-    try:
-        feature_order = list(reg_scaler.feature_names_in_)
-        df = df[feature_order]
-    except Exception:
-        pass
-
-    return reg_scaler.transform(df)
\ No newline at end of file
+    record = dict.fromkeys(CLUSTER_FEATURES + REGRESSION_FEATURES, 1.0)
+    prepare_features_from_json(record)
+    signed_expm1(prepare_regression_features_from_json(record))